@@ -1,7 +1,7 @@
 import numpy as np
 import slippy
 from itertools import product
-from collections import defaultdict
+from numbers import Integral
 from slippy.core import _SubModelABC, plan_multi_convolve, _IMMaterial, get_derived_stresses
 from typing import Sequence, Union
 
@@ -36,6 +36,10 @@ class SubsurfaceStress(_SubModelABC):
     cuda_convolutions: bool, optional (False)
         If True the computations will be carried out on the GPU (if cupy can be imported), This may result in faster
         computations depending on hardware but kernels and results must be stored on GPU memory.
+    z_block_size: int, optional (None)
+        If set, the depths are processed in blocks of this many points, only the requested components are stored for
+        the full depth. This reduces the peak memory use when derived stresses are requested. By default all depths
+        are processed together.
 
     Notes
     -----
@@ -61,11 +65,13 @@ class SubsurfaceStress(_SubModelABC):
     def __init__(self, z: np.array = None, surface: Union[int, Sequence[int]] = (1, 2),
                  name: str = 'sub_surface_stress', periodic_axes: Sequence[bool] = (False, False),
                  load_components: str = 'z', stress_components: Union[str, Sequence[str]] = ('all',),
-                 keep_kernels: bool = True, cuda_convolutions: bool = False):
+                 keep_kernels: bool = True, cuda_convolutions: bool = False, z_block_size: int = None):
         if isinstance(surface, int):
             surface = (surface,)
         if isinstance(stress_components, str):
             stress_components = (stress_components,)
+        if z_block_size is not None and (not isinstance(z_block_size, Integral) or z_block_size < 1):
+            raise ValueError(f"z_block_size must be None or a positive integer, received: {z_block_size}")
         for lc in load_components:
             if lc not in 'xz':
                 raise ValueError(f"Unrecognised load direction: {lc}, valid directions are: x, z")
@@ -88,11 +94,12 @@ class SubsurfaceStress(_SubModelABC):
         self.keep_kernels = keep_kernels
         self.cuda_convolutions = cuda_convolutions
         self._kernel_cache = {s: dict() for s in surface}
-        self._cache_span = (0, 0)
+        self._cache_layout = None
         self.z = z
         calc_all = any(s in stress_components for s in ('1', '2', '3', 'vm'))
         self.comps_to_find = tensor_terms if calc_all else stress_components
         self.periodic_axes = periodic_axes
+        self.z_block_size = z_block_size
 
     def solve(self, current_state: dict) -> dict:
         if self.cuda_convolutions:
@@ -102,13 +109,13 @@ class SubsurfaceStress(_SubModelABC):
         example_loads = current_state['loads_' + self.load_components[0]]
         span = tuple([s*(2-pa) for s, pa in zip(example_loads.shape, self.periodic_axes)])
         if self.z is None:
-            z_len = min(example_loads.shape)//2
+            z_len = min(span)//2
         else:
             z_len = len(self.z)
         out_put_shape = (z_len,) + example_loads.shape
-
-        def default_factory():
-            return xp.zeros(out_put_shape)
+        z_block_size = self.z_block_size or z_len
+        z_blocks = [slice(z0, min(z0 + z_block_size, z_len)) for z0 in range(0, z_len, z_block_size)]
+        derived = [sc for sc in self.stress_components if sc in ('1', '2', '3', 'vm')]
 
         for surface_num in self.surfaces:
             surface = self.model.__getattribute__('surface_' + str(surface_num))
@@ -116,36 +123,80 @@ class SubsurfaceStress(_SubModelABC):
             grid_spacing = [surface.grid_spacing, ] * 2
             assert (isinstance(material, _IMMaterial)), 'Sub surface stress only valid for influence matrix based ' \
                                                         'materials'
-            intermediate_results = defaultdict(default_factory)
+            all_loads = dict()
+            all_conv_funcs = dict()
             for l_comp in self.load_components:
-                if self.keep_kernels and span == self._cache_span and l_comp in self._kernel_cache[surface_num]:
-                    conv_funcs = self._kernel_cache[surface_num][l_comp]
+                loads = current_state['loads_' + l_comp]
+                if l_comp in 'xy' and surface_num == 2:
+                    loads = loads*-1
+                all_loads[l_comp] = loads
+                all_conv_funcs[l_comp] = self._get_conv_funcs(surface_num, l_comp, material, grid_spacing, span,
+                                                              z_blocks, example_loads)
+
+            comp_index = {key: i for i, key in enumerate(self.comps_to_find)}
+            single_block = len(z_blocks) == 1
+            # views of the stress tensor are only returned if they don't keep unrequested components in memory
+            keep_views = single_block and all(key in self.stress_components for key in self.comps_to_find)
+            results = dict() if single_block else {key: xp.empty(out_put_shape) for key in self.stress_components}
+            for block_num, z_block in enumerate(z_blocks):
+                block_shape = (z_block.stop - z_block.start,) + example_loads.shape
+                # all of the tensor components for the block are held in one contiguous array
+                # each call convolves the loads with every component's kernels, sharing the fft of the loads
+                stress_shape = (len(self.comps_to_find),) + block_shape
+                first_comp = self.load_components[0]
+                stress = all_conv_funcs[first_comp][block_num](all_loads[first_comp]).reshape(stress_shape)
+                for l_comp in self.load_components[1:]:
+                    stress += all_conv_funcs[l_comp][block_num](all_loads[l_comp]).reshape(stress_shape)
+
+                # find other stress components
+                if derived:
+                    tensor_components = {key: stress[i] for key, i in comp_index.items()}
+                    block_results = get_derived_stresses(tensor_components, derived)
+                    del tensor_components
                 else:
-                    args = (self.comps_to_find, grid_spacing, span, self.z, self.cuda_convolutions)
-                    if l_comp == 'z':
-                        im_comps = material.sss_influence_matrices_normal(*args)
-                    elif l_comp == 'x':
-                        im_comps = material.sss_influence_matrices_tangential_x(*args)
-                    elif l_comp == 'y':
-                        im_comps = material.sss_influence_matrices_tangential_y(*args)
+                    block_results = dict()
+                # only the requested components are kept, derived stresses can include unrequested principals
+                for key in self.stress_components:
+                    if key in comp_index:
+                        value = stress[comp_index[key]]
+                        if single_block and not keep_views:
+                            value = value.copy()
+                    else:
+                        value = block_results[key]
+                    if single_block:
+                        results[key] = value
                     else:
-                        raise ValueError(f"Unrecognised load component requested: {l_comp}")
-                    conv_funcs = {key: plan_multi_convolve(example_loads, value, None, self.periodic_axes,
-                                                           self.cuda_convolutions) for
-                                  key, value in im_comps.items()}
-                    if self.keep_kernels:
-                        self._cache_span = span
-                        self._kernel_cache[surface_num][l_comp] = conv_funcs
-
-                for key, conv_func in conv_funcs.items():
-                    loads = current_state['loads_' + l_comp]
-                    if l_comp in 'xy' and surface_num == 2:
-                        loads = loads*-1
-                    intermediate_results[key] += conv_func(loads)
-
-            # find other stress components
-            intermediate_results.update(get_derived_stresses(intermediate_results, self.stress_components, True))
+                        results[key][z_block] = value
+                del stress, block_results
 
             for key in self.stress_components:
-                current_state['surface_' + str(surface_num) + '_' + key] = intermediate_results[key]
+                current_state['surface_' + str(surface_num) + '_' + key] = results[key]
         return current_state
+
+    def _get_conv_funcs(self, surface_num, l_comp, material, grid_spacing, span, z_blocks, example_loads):
+        """List of convolution functions, one for each block of depths, each convolves the loads with the kernels for
+        every component in comps_to_find"""
+        # the cached plans are only valid for the span and depth blocks they were made for
+        layout = (span, tuple((z_block.start, z_block.stop) for z_block in z_blocks))
+        if self.keep_kernels and layout != self._cache_layout:
+            self._kernel_cache = {s: dict() for s in self.surfaces}
+            self._cache_layout = layout
+        if self.keep_kernels and l_comp in self._kernel_cache[surface_num]:
+            return self._kernel_cache[surface_num][l_comp]
+        args = (self.comps_to_find, grid_spacing, span, self.z, self.cuda_convolutions)
+        if l_comp == 'z':
+            im_comps = material.sss_influence_matrices_normal(*args)
+        elif l_comp == 'x':
+            im_comps = material.sss_influence_matrices_tangential_x(*args)
+        elif l_comp == 'y':
+            im_comps = material.sss_influence_matrices_tangential_y(*args)
+        else:
+            raise ValueError(f"Unrecognised load component requested: {l_comp}")
+        xp = slippy.xp if self.cuda_convolutions else np
+        conv_funcs = [plan_multi_convolve(example_loads,
+                                          xp.concatenate([im_comps[key][z_block] for key in self.comps_to_find]),
+                                          None, self.periodic_axes, self.cuda_convolutions, fft_ims=False)
+                      for z_block in z_blocks]
+        if self.keep_kernels:
+            self._kernel_cache[surface_num][l_comp] = conv_funcs
+        return conv_funcs
@@ -0,0 +1,71 @@
+import numpy as np
+import numpy.testing as npt
+import pytest
+from scipy.signal import fftconvolve
+
+import slippy.contact as c
+import slippy.core as core
+import slippy.surface as s
+
+tensor_terms = ('xx', 'yy', 'zz', 'xy', 'yz', 'xz')
+
+
+def test_sub_surface_stress():
+    n = 16
+    grid_spacing = 1e-3
+    z = np.linspace(1e-4, 5e-3, 6)
+    steel = core.Elastic('steel_sub_surface_stress', {'E': 200e9, 'v': 0.3})
+    flat_1 = s.FlatSurface(shape=(n, n), grid_spacing=grid_spacing, generate=True)
+    flat_1.material = steel
+    flat_2 = s.FlatSurface(shape=(n, n), grid_spacing=grid_spacing, generate=True)
+    model = c.ContactModel('sub_surface_stress_test', flat_1, flat_2)
+
+    np.random.seed(0)
+    loads = {'z': np.random.rand(n, n) * 1e6, 'x': np.random.rand(n, n) * 1e5}
+
+    # direct (non periodic) convolution of the spatial kernels
+    span = (2 * n, 2 * n)
+    centre = n - 1
+    expected = {key: np.zeros((len(z), n, n)) for key in tensor_terms}
+    for l_comp, im_func in (('z', steel.sss_influence_matrices_normal),
+                            ('x', steel.sss_influence_matrices_tangential_x)):
+        ims = im_func(tensor_terms, [grid_spacing] * 2, span, z)
+        for key, im in ims.items():
+            expected[key] += fftconvolve(np.expand_dims(loads[l_comp], 0), im,
+                                         mode='full')[:, centre:centre + n, centre:centre + n]
+
+    derived = core.get_derived_stresses(expected, ['1', '2', '3', 'vm'])
+
+    for z_block_size in (None, 4):
+        sub_model = c.sub_models.SubsurfaceStress(z=z, surface=1, load_components='zx',
+                                                  stress_components=('all', 'vm', '1', '2', '3'),
+                                                  z_block_size=z_block_size)
+        sub_model.model = model
+        result = sub_model.solve({'loads_z': loads['z'], 'loads_x': loads['x']})
+
+        for key in tensor_terms:
+            npt.assert_allclose(result['surface_1_' + key], expected[key], atol=1e-9 * np.abs(expected[key]).max())
+
+        for key, value in derived.items():
+            npt.assert_allclose(result['surface_1_' + key], value, atol=1e-6 * np.abs(value).max())
+
+    # changing the depth blocks after a solve should not reuse the cached kernels
+    sub_model.z_block_size = 2
+    result = sub_model.solve({'loads_z': loads['z'], 'loads_x': loads['x']})
+    npt.assert_allclose(result['surface_1_xx'], expected['xx'], atol=1e-9 * np.abs(expected['xx']).max())
+
+    # only some of the derived stresses requested
+    for z_block_size in (None, 1, 4):
+        sub_model = c.sub_models.SubsurfaceStress(z=z, surface=1, load_components='zx',
+                                                  stress_components=('xx', '1'), z_block_size=z_block_size)
+        sub_model.model = model
+        result = sub_model.solve({'loads_z': loads['z'], 'loads_x': loads['x']})
+        assert 'surface_1_2' not in result and 'surface_1_yy' not in result
+        npt.assert_allclose(result['surface_1_xx'], expected['xx'], atol=1e-9 * np.abs(expected['xx']).max())
+        npt.assert_allclose(result['surface_1_1'], derived['1'], atol=1e-6 * np.abs(derived['1']).max())
+
+
+def test_sub_surface_stress_block_size():
+    for z_block_size in (0, -1, 2.5):
+        with pytest.raises(ValueError):
+            c.sub_models.SubsurfaceStress(z_block_size=z_block_size)
@@ -6,21 +6,24 @@ from collections.abc import Sequence
 __all__ = ['get_derived_stresses', 'solve_cubic']
 
 _cuda_cubic_cache = {}
+_cuda_principal_cache = {}
 
 try:
     import cupy as cp
 
-    def _make_cuda_cubic_solver(dtype):
-        eps = slippy.CUBIC_EPS
+    def _cuda_single_suffix(dtype):
         s_dtype = str(dtype)
         if not s_dtype.startswith("float"):
             raise ValueError("can only make cubic solver for single and double floats")
         single = 'f' if str(s_dtype).endswith('32') else ''
         if not single and not str(s_dtype).endswith('64'):
             raise ValueError("can only make cubic solver for single and double floats")
-        cubic_kernel = cp.ElementwiseKernel(
-            "T b, T c, T d", "T r1, T r2, T r3",
-            f'''
+        return single
+
+    def _cuda_cubic_source(single):
+        """Source for finding the roots (r1, r2, r3) of x^3 + bx^2 + cx + d = 0, in ascending order"""
+        eps = slippy.CUBIC_EPS
+        return f'''
         if (fabs{single}(d) < {eps}) {{
         // cancel and find remaining roots by quadratic formula
         r1 = 0;
@@ -51,7 +54,7 @@ try:
         if (fabs{single}(e) < {eps}) {{ // two roots
             r2 = -1.5*q/p - b/3;
             r3 = 3*q/p - b/3;
-            T f_prime2 = 3*r2*r3 + 2*b*r2+c;
+            T f_prime2 = 3*r2*r2 + 2*b*r2+c;
             T f_prime3 = 3*r3*r3 + 2*b*r3+c;
             if (fabs{single}(f_prime2) < fabs{single}(f_prime3)) {{
                 r1 = r2;
@@ -107,10 +110,44 @@ try:
                 r3 = temp;
             }}
         }}
-        return;
-        ''', 'solve_cubic', return_tuple=True)
+        '''
+
+    def _make_cuda_cubic_solver(dtype):
+        single = _cuda_single_suffix(dtype)
+        cubic_kernel = cp.ElementwiseKernel(
+            "T b, T c, T d", "T r1, T r2, T r3", _cuda_cubic_source(single), 'solve_cubic', return_tuple=True)
         return cubic_kernel
 
+    def _make_cuda_principal_solver(dtype, von_mises):
+        """Finds the principal stresses (and optionally the von mises stress) from the tensor components in one
+        kernel"""
+        single = _cuda_single_suffix(dtype)
+        outputs = "T s1, T s2, T s3, T vm" if von_mises else "T s1, T s2, T s3"
+        vm_source = f'''
+        vm = sqrt{single}(((xx - yy) * (xx - yy) + (yy - zz) * (yy - zz) + (zz - xx) * (zz - xx) +
+                          6 * (xy * xy + yz * yz + xz * xz)) / 2);
+        ''' if von_mises else ''
+        principal_kernel = cp.ElementwiseKernel(
+            "T xx, T yy, T zz, T xy, T yz, T xz", outputs,
+            '''
+        T b = -(xx + yy + zz);
+        T c = xx * yy + yy * zz + xx * zz - xy * xy - xz * xz - yz * yz;
+        T d = -(xx * yy * zz + 2 * xy * xz * yz - xx * yz * yz - yy * xz * xz - zz * xy * xy);
+        T r1, r2, r3;
+        ''' + _cuda_cubic_source(single) + '''
+        s1 = r3;
+        s2 = r2;
+        s3 = r1;
+        ''' + vm_source, 'principal_stresses', return_tuple=True)
+        return principal_kernel
+
+    def _principal_stresses_cuda(tensor_components: dict, von_mises: bool):
+        components = [tensor_components[key] for key in ('xx', 'yy', 'zz', 'xy', 'yz', 'xz')]
+        key = (components[0].dtype, von_mises)
+        if key not in _cuda_principal_cache:
+            _cuda_principal_cache[key] = _make_cuda_principal_solver(*key)
+        return _cuda_principal_cache[key](*components)
+
     def _solve_cubic_cuda(b, c, d):
         assert isinstance(b, cp.ndarray) and isinstance(c, cp.ndarray) and isinstance(d, cp.ndarray), \
             "Arrays must all be cupy arrays"
@@ -119,9 +156,77 @@ try:
             _cuda_cubic_cache[b.dtype] = _make_cuda_cubic_solver(b.dtype)
         return _cuda_cubic_cache[b.dtype](b, c, d)
 
+    _von_mises_cuda = cp.ElementwiseKernel(
+        "T xx, T yy, T zz, T xy, T yz, T xz", "T vm",
+        "vm = sqrt(((xx - yy) * (xx - yy) + (yy - zz) * (yy - zz) + (zz - xx) * (zz - xx) + "
+        "6 * (xy * xy + yz * yz + xz * xz)) / 2)",
+        'von_mises')
+
 except ImportError:
     cp = None
     _solve_cubic_cuda = None
+    _von_mises_cuda = None
+    _principal_stresses_cuda = None
+
+
+@numba.njit
+def _cubic_roots(b, c, d, eps):
+    """Roots of x^3 + bx^2 + cx + d = 0 in ascending order, see solve_cubic"""
+    if np.abs(d) < eps:
+        # cancel and find remaining roots by quadratic formula
+        r1 = 0.0 * b
+        diff = np.sqrt(b * b - 4 * c) / 2
+        r2 = (-b) / 2 + diff
+        r3 = (-b) / 2 - diff
+    else:
+        # convert to depressed cubic
+        p = c - b ** 2 / 3
+        q = 2 * b ** 3 / 27 - b * c / 3 + d
+        if np.abs(p) < eps:
+            r1 = np.sign(-q) * np.abs(q) ** (1 / 3) - b / 3
+            r2 = r1
+            r3 = r1
+        elif np.abs(q) < eps:
+            r3 = - b / 3
+            if p < 0:
+                diff = np.sqrt(-p)
+                r2 = diff - b / 3
+                r1 = - diff - b / 3
+            else:
+                r1 = r3
+                r2 = r3
+        else:
+            e = q * q / 4 + p * p * p / 27
+            if np.abs(e) < eps:
+                r2 = -1.5 * q / p - b / 3
+                r3 = 3 * q / p - b / 3
+                f_prime2 = 3 * r2 ** 2 + 2 * b * r2 + c
+                f_prime3 = 3 * r3 ** 2 + 2 * b * r3 + c
+                if np.abs(f_prime2) < np.abs(f_prime3):
+                    r1 = r2
+                else:
+                    r1 = r3
+            elif e > 0:
+                u = -q / 2 - np.sqrt(e)
+                u = np.sign(u) * np.abs(u) ** (1 / 3)
+                r1 = u - p / (3 * u) - b / 3
+                r2 = r1
+                r3 = r1
+            else:
+                u = 2 * np.sqrt(-p / 3)
+                t = np.arccos(3 * q / p / u) / 3
+                k = 2 * np.pi / 3
+                r1 = u * np.cos(t) - b / 3
+                r2 = u * np.cos(t - k) - b / 3
+                r3 = u * np.cos(t - 2 * k) - b / 3
+    # sort the roots
+    if r1 > r2:
+        r1, r2 = r2, r1
+    if r2 > r3:
+        r2, r3 = r3, r2
+    if r1 > r2:
+        r1, r2 = r2, r1
+    return r1, r2, r3
 
 
 def _make_numba_cubic_solver(dtype):
@@ -132,55 +237,7 @@ def _make_numba_cubic_solver(dtype):
 
     def solve_cubic_numba_base(b, c, d, r1, r2, r3):
         for i in range(len(b)):
-            if np.abs(d[i]) < eps:
-                # cancel and find remaining roots by quadratic formula
-                r1[i] = 0
-                diff = np.sqrt(b[i] * b[i] - 4 * c[i]) / 2
-                r2[i] = (-b[i]) / 2 + diff
-                r3[i] = (-b[i]) / 2 - diff
-            else:
-                # convert to depressed cubic
-                p = c[i] - b[i] ** 2 / 3
-                q = 2 * b[i] ** 3 / 27 - b[i] * c[i] / 3 + d[i]
-                if np.abs(p) < eps:
-                    r1[i] = np.sign(-q) * np.abs(q) ** (1 / 3) - b[i] / 3
-                    r2[i] = r1[i]
-                    r3[i] = r1[i]
-                elif np.abs(q) < eps:
-                    r3[i] = - b[i] / 3
-                    if p < 0:
-                        diff = np.sqrt(-p)
-                        r2[i] = diff - b[i] / 3
-                        r1[i] = - diff - b[i] / 3
-                    else:
-                        r1[i] = r3[i]
-                        r2[i] = r3[i]
-                else:
-                    e = q * q / 4 + p * p * p / 27
-                    if np.abs(e) < eps:
-                        r2[i] = -1.5 * q / p - b[i] / 3
-                        r3[i] = 3 * q / p - b[i] / 3
-                        f_prime2 = 3 * r2[i] ** 2 + 2 * b[i] * r2[i] + c[i]
-                        f_prime3 = 3 * r3[i] ** 2 + 2 * b[i] * r3[i] + c[i]
-                        if np.abs(f_prime2) < np.abs(f_prime3):
-                            r1[i] = r2[i]
-                        else:
-                            r1[i] = r3[i]
-                    elif e > 0:
-                        u = -q / 2 - np.sqrt(e)
-                        u = np.sign(u) * np.abs(u) ** (1 / 3)
-                        r1[i] = u - p / (3 * u) - b[i] / 3
-                        r2[i] = r1[i]
-                        r3[i] = r1[i]
-                    else:
-                        u = 2 * np.sqrt(-p / 3)
-                        t = np.arccos(3 * q / p / u) / 3
-                        k = 2 * np.pi / 3
-                        r1[i] = u * np.cos(t) - b[i] / 3
-                        r2[i] = u * np.cos(t - k) - b[i] / 3
-                        r3[i] = u * np.cos(t - 2 * k) - b[i] / 3
-            # sort the array
-            r1[i], r2[i], r3[i] = np.sort(np.array([r1[i], r2[i], r3[i]]))
+            r1[i], r2[i], r3[i] = _cubic_roots(b[i], c[i], d[i], eps)
 
     numba_type = numba.__getattribute__(s_dtype)
     raw_func = numba.guvectorize([(numba_type[:], numba_type[:], numba_type[:],
@@ -210,6 +267,52 @@ def _solve_cubic_numba(b, c, d):
     return _numba_cubic_cache[b.dtype](b, c, d)
 
 
+@numba.njit(parallel=True)
+def _principal_stresses_numba_base(xx, yy, zz, xy, yz, xz, eps, s1, s2, s3):
+    for i in numba.prange(xx.size):
+        b = -(xx[i] + yy[i] + zz[i])
+        c = xx[i] * yy[i] + yy[i] * zz[i] + xx[i] * zz[i] - xy[i] ** 2 - xz[i] ** 2 - yz[i] ** 2
+        d = -(xx[i] * yy[i] * zz[i] + 2 * xy[i] * xz[i] * yz[i] -
+              xx[i] * yz[i] ** 2 - yy[i] * xz[i] ** 2 - zz[i] * xy[i] ** 2)
+        s3[i], s2[i], s1[i] = _cubic_roots(b, c, d, eps)
+
+
+@numba.njit(parallel=True)
+def _von_mises_numba_base(xx, yy, zz, xy, yz, xz, vm):
+    for i in numba.prange(xx.size):
+        vm[i] = np.sqrt(((xx[i] - yy[i]) ** 2 + (yy[i] - zz[i]) ** 2 + (zz[i] - xx[i]) ** 2 +
+                         6 * (xy[i] ** 2 + yz[i] ** 2 + xz[i] ** 2)) / 2)
+
+
+def _flat_tensor_components(tensor_components: dict):
+    """Flat contiguous tensor components broadcast to a common shape and promoted to a common floating point dtype,
+    the numba kernels index every component with the same flat index"""
+    components = np.broadcast_arrays(*[np.asarray(tensor_components[key])
+                                       for key in ('xx', 'yy', 'zz', 'xy', 'yz', 'xz')])
+    dtype = np.result_type(*components)
+    if not np.issubdtype(dtype, np.floating):
+        dtype = np.result_type(dtype, np.float64)
+    return [np.ascontiguousarray(c, dtype=dtype).reshape(-1) for c in components], components[0].shape, dtype
+
+
+def _principal_stresses_numba(tensor_components: dict):
+    """Principal stresses from numpy stress tensor components, each element of the inputs is read once and no full
+    size intermediate arrays are made"""
+    components, shape, dtype = _flat_tensor_components(tensor_components)
+    s1, s2, s3 = [np.empty(shape, dtype=dtype) for _ in range(3)]
+    _principal_stresses_numba_base(*components, slippy.CUBIC_EPS, s1.reshape(-1), s2.reshape(-1), s3.reshape(-1))
+    return s1, s2, s3
+
+
+def _von_mises_numba(tensor_components: dict):
+    """Von Mises stress from numpy stress tensor components, each element of the inputs is read once and no full
+    size intermediate arrays are made"""
+    components, shape, dtype = _flat_tensor_components(tensor_components)
+    vm = np.empty(shape, dtype=dtype)
+    _von_mises_numba_base(*components, vm.reshape(-1))
+    return vm
+
+
 def solve_cubic(b, c, d):
     """ Find roots of cubic equation x^3 + bx^2 + cx + d = 0
 
@@ -247,19 +350,20 @@ def get_derived_stresses(tensor_components: dict, required_components: Sequence,
         arrays
     required_components: Sequence
         The required derived stresses, valid items are: '1', '2', '3' and/or 'vm', relating to principal stresses and
-        von mises stress respectively. If tensor components are also present these will not be deleted if delete is
-        set to True
+        von mises stress respectively. Tensor components can also be included, these are ignored
     delete: bool, optional (True)
-        If True the tensor components will be deleted after computation with the exception of components who's names
-        are in required_components
+        Kept for backwards compatibility, the tensor_components dict is never modified. Callers which no longer need
+        the tensor components should delete them themselves
 
     Returns
     -------
     dict of derived components
 
     """
-    if not all([rc in {'1', '2', '3', 'vm'} for rc in required_components]):
-        raise ValueError("Unrecognised derived stress component, allowed components are: '1', '2', '3', 'vm'")
+    tensor_terms = ('xx', 'yy', 'zz', 'xy', 'yz', 'xz')
+    if not all([rc in {'1', '2', '3', 'vm'} or rc in tensor_terms for rc in required_components]):
+        raise ValueError("Unrecognised derived stress component, allowed components are: '1', '2', '3', 'vm' and the "
+                         "tensor components")
 
     if isinstance(tensor_components['xx'], np.ndarray):
         xp = np
@@ -270,25 +374,20 @@ def get_derived_stresses(tensor_components: dict, required_components: Sequence,
         except TypeError:
             xp = slippy.xp
     rtn_dict = dict()
-    if 'vm' in required_components:
-        rtn_dict['vm'] = xp.sqrt(((tensor_components['xx'] - tensor_components['yy']) ** 2 +
-                                  (tensor_components['yy'] - tensor_components['zz']) ** 2 +
-                                  (tensor_components['zz'] - tensor_components['xx']) ** 2 +
-                                  6 * (tensor_components['xy'] ** 2 +
-                                       tensor_components['yz'] ** 2 +
-                                       tensor_components['xz'] ** 2)) / 2)
-    if '1' in required_components or '2' in required_components or '3' in required_components:
-        b = -(tensor_components['xx'] + tensor_components['yy'] + tensor_components['zz'])
-        c = (tensor_components['xx'] * tensor_components['yy'] +
-             tensor_components['yy'] * tensor_components['zz'] +
-             tensor_components['xx'] * tensor_components['zz'] -
-             tensor_components['xy'] ** 2 - tensor_components['xz'] ** 2 - tensor_components[
-                 'yz'] ** 2)
-        d = -((tensor_components['xx'] * tensor_components['yy'] * tensor_components['zz'] +
-               2 * tensor_components['xy'] * tensor_components['xz'] * tensor_components['yz'] -
-               tensor_components['xx'] * tensor_components['yz'] ** 2 -
-               tensor_components['yy'] * tensor_components['xz'] ** 2 -
-               tensor_components['zz'] * tensor_components['xy'] ** 2))
-
-        rtn_dict['3'], rtn_dict['2'], rtn_dict['1'] = solve_cubic(b, c, d)
+    find_principal = '1' in required_components or '2' in required_components or '3' in required_components
+    if xp is np:
+        # fused kernels, each tensor component is read once and no intermediate arrays are made
+        if 'vm' in required_components:
+            rtn_dict['vm'] = _von_mises_numba(tensor_components)
+        if find_principal:
+            rtn_dict['1'], rtn_dict['2'], rtn_dict['3'] = _principal_stresses_numba(tensor_components)
+    elif find_principal:
+        # a single kernel launch for all the derived stresses
+        results = _principal_stresses_cuda(tensor_components, 'vm' in required_components)
+        rtn_dict['1'], rtn_dict['2'], rtn_dict['3'] = results[:3]
+        if 'vm' in required_components:
+            rtn_dict['vm'] = results[3]
+    elif 'vm' in required_components:
+        rtn_dict['vm'] = _von_mises_cuda(*[tensor_components[key] for key in tensor_terms])
+
     return rtn_dict
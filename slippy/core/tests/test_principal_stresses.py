@@ -80,3 +80,55 @@ def test_solve_cubic_cuda():
                 npt.assert_allclose(cp.asnumpy(roots), [np_roots[0]] * 3, atol=1e-7)
             else:
                 raise ValueError("This should never happen")
+
+
+def test_derived_stresses_arrays():
+    np.random.seed(0)
+    shape = (3, 4, 5)
+    named_tensor = {key: np.random.uniform(-100, 100, shape) for key in ('xx', 'yy', 'zz', 'xy', 'yz', 'xz')}
+    tensors = np.array([[named_tensor['xx'], named_tensor['xy'], named_tensor['xz']],
+                        [named_tensor['xy'], named_tensor['yy'], named_tensor['yz']],
+                        [named_tensor['xz'], named_tensor['yz'], named_tensor['zz']]])
+    expected = np.linalg.eigvalsh(np.moveaxis(tensors, (0, 1), (-2, -1)))
+    found = get_derived_stresses(named_tensor, ['1', '2', '3'])
+    for i, key in enumerate(['3', '2', '1']):
+        assert found[key].shape == shape
+        npt.assert_allclose(found[key], expected[..., i], atol=1e-6)
+
+
+def test_von_mises():
+    np.random.seed(0)
+    shape = (3, 4, 5)
+    named_tensor = {key: np.random.uniform(-100, 100, shape) for key in ('xx', 'yy', 'zz', 'xy', 'yz', 'xz')}
+    found = get_derived_stresses(named_tensor, ['vm', '1', '2', '3'])
+    # von mises stress from the principal stresses
+    expected = np.sqrt(((found['1'] - found['2']) ** 2 + (found['2'] - found['3']) ** 2 +
+                        (found['3'] - found['1']) ** 2) / 2)
+    npt.assert_allclose(found['vm'], expected, rtol=1e-8)
+
+
+def test_derived_stresses_tensor_unchanged():
+    named_tensor = {key: np.ones(3) for key in ('xx', 'yy', 'zz', 'xy', 'yz', 'xz')}
+    found = get_derived_stresses(named_tensor, ['vm', 'xx'])
+    assert set(found) == {'vm'}
+    assert len(named_tensor) == 6
+
+
+def test_derived_stresses_types():
+    # integer components are promoted to floats
+    named_tensor = {'xx': np.array([5, 6, 9]), 'yy': np.array([0, 2, 4]), 'zz': np.zeros(3, dtype=int),
+                    'xy': np.zeros(3, dtype=int), 'yz': np.zeros(3, dtype=int), 'xz': np.zeros(3, dtype=int)}
+    found = get_derived_stresses(named_tensor, ['vm', '1', '2', '3'])
+    npt.assert_allclose(found['vm'], np.sqrt([25, 28, 61]))
+    npt.assert_allclose(found['1'], [5, 6, 9])
+    npt.assert_allclose(found['2'], [0, 2, 4])
+    assert all(value.dtype == np.float64 for value in found.values())
+    # components are broadcast against each other
+    np.random.seed(0)
+    normal = {key: np.random.uniform(-100, 100, (3, 4)) for key in ('xx', 'yy', 'zz')}
+    shear = {key: np.random.uniform(-100, 100, (1,)) for key in ('xy', 'yz', 'xz')}
+    found = get_derived_stresses({**normal, **shear}, ['vm', '1', '2', '3'])
+    full = {key: np.broadcast_to(value, (3, 4)).copy() for key, value in {**normal, **shear}.items()}
+    expected = get_derived_stresses(full, ['vm', '1', '2', '3'])
+    for key, value in expected.items():
+        npt.assert_allclose(found[key], value)
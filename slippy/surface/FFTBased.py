@@ -25,6 +25,7 @@ import typing
 from numbers import Number
 
 import numpy as np
+from scipy import fft as sfft
 
 from .Surface_class import _AnalyticalSurface, Surface
 
@@ -81,6 +82,7 @@ class DiscFreqSurface(_AnalyticalSurface):
     """
     is_discrete = False
     surface_type = 'discreteFreq'
+    _basis_cache = None
 
     def __init__(self, frequencies: typing.Sequence[float], amplitudes: typing.Sequence[float] = (1,),
                  phases: typing.Sequence[float] = (0,), rotation: Number = 0,
@@ -93,37 +95,73 @@ class DiscFreqSurface(_AnalyticalSurface):
         else:
             raise ValueError('Frequencies, amplitudes and phases must be equal'
                              'length lists or np.arrays')
-        is_complex = [type(amp) is complex for amp in amplitudes]
-        if any(is_complex):
+        if np.iscomplexobj(amplitudes):
             if not len(frequencies) == len(amplitudes):
                 raise ValueError('Frequencies, amplitudes and phases must be'
                                  ' equal length lists or np.arrays')
             else:
-                self.amplitudes = amplitudes
+                self.amplitudes = np.ascontiguousarray(amplitudes, dtype=np.complex128)
         else:
             if not len(frequencies) == len(amplitudes) == len(phases):
                 raise ValueError('Frequencies, amplitudes and phases must be'
                                  ' equal length lists or np.arrays')
             else:
-                cplx_amps = []
-                for idx in range(len(amplitudes)):
-                    cplx_amps.append(amplitudes[idx] *
-                                     np.exp(1j * phases[idx]))
-                self.amplitudes = cplx_amps
+                self.amplitudes = np.ascontiguousarray(np.asarray(amplitudes, dtype=np.float64) *
+                                                       np.exp(1j * np.asarray(phases, dtype=np.float64)))
 
         super().__init__(generate=generate, rotation=rotation, shift=shift,
                          grid_spacing=grid_spacing, extent=extent, shape=shape)
 
+    @property
+    def frequencies(self):
+        return self._frequencies
+
+    @frequencies.setter
+    def frequencies(self, value):
+        self._frequencies = np.ascontiguousarray(value, dtype=np.float64)
+        self._basis_cache = None
+
     def _height(self, x_mesh, y_mesh):
-        profile = np.zeros_like(x_mesh)
-        for idx in range(len(self.frequencies)):
-            profile += np.real(self.amplitudes[idx] *
-                               np.exp(-1j * self.frequencies[idx] * x_mesh * 2 * np.pi))
-        return profile
+        x_mesh = np.asarray(x_mesh)
+        # on regular grids x is constant along one axis, the basis is then only needed for a single line of points
+        line = None
+        if x_mesh.ndim == 2:
+            if np.all(x_mesh == x_mesh[:1, :]):
+                line = x_mesh[:1, :]
+            elif np.all(x_mesh == x_mesh[:, :1]):
+                line = x_mesh[:, :1]
+        if line is None:
+            # scattered or rotated points, the basis is made for blocks of points so it is never larger than ~16MB
+            flat_x = x_mesh.reshape(-1)
+            block = max(1, 2 ** 20 // max(1, len(self.frequencies)))
+            heights = np.empty(flat_x.shape)
+            for start in range(0, flat_x.size, block):
+                basis = np.exp(-2j * np.pi * np.multiply.outer(self.frequencies, flat_x[start:start + block]))
+                heights[start:start + block] = np.real(np.tensordot(self.amplitudes, basis, axes=1))
+            return heights.reshape(x_mesh.shape)
+        # the line basis only depends on the frequencies and the points, it is kept for repeated calls on the same grid
+        if self._basis_cache is not None and np.array_equal(self._basis_cache[0], line):
+            basis = self._basis_cache[1]
+        else:
+            # basis has shape (n_frequencies,) + line.shape, summing over the first axis is a single matrix product
+            basis = np.exp(-2j * np.pi * np.multiply.outer(self.frequencies, line))
+            self._basis_cache = (line.copy(), basis)
+        heights = np.real(np.tensordot(self.amplitudes, basis, axes=1))
+        return np.broadcast_to(heights, x_mesh.shape).copy()
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__) or (self.is_discrete and other.is_discrete):
+            return super().__eq__(other)
+        # the cached basis is not part of the surface definition
+        ignore = ('_basis_cache', '_frequencies', 'amplitudes')
+        return (np.array_equal(self.frequencies, other.frequencies) and
+                np.array_equal(self.amplitudes, other.amplitudes) and
+                {k: v for k, v in self.__dict__.items() if k not in ignore} ==
+                {k: v for k, v in other.__dict__.items() if k not in ignore})
 
     def __repr__(self):
         string = self._repr_helper()
-        return f'DiscFreqSurface({self.frequencies}, {self.amplitudes}{string})'
+        return f'DiscFreqSurface({self.frequencies.tolist()}, {self.amplitudes.tolist()}{string})'
 
 
 class ProbFreqSurface(_AnalyticalSurface):
@@ -164,17 +202,22 @@ class ProbFreqSurface(_AnalyticalSurface):
         grid_spacing, extent, shape = check_coords_are_simple(x_mesh, y_mesh)
 
         qny = np.pi / grid_spacing
-
-        u = np.linspace(0, qny, shape[0])
-        u_mesh, v_mesh = np.meshgrid(u, u)
-        freqs = np.abs(u_mesh + v_mesh)
-        varience = np.zeros(freqs.shape)
-        varience[np.logical_and((1 / freqs) > (1 / self.qr), (2 * np.pi / freqs) <= (extent[0]))] = 1
-        varience[np.logical_and((1 / freqs) >= (1 / self.qs), (1 / freqs) < (1 / self.qr))] = \
-            (freqs[np.logical_and(1 / freqs >= 1 / self.qs, 1 / freqs < 1 / self.qr)] / self.qr) ** (-2 * (1 + self.h))
-
-        fou_trans = np.reshape(np.array([np.random.normal() * var ** 0.5 for var in varience.flatten()]), freqs.shape)
-        return np.real(np.fft.ifft2(fou_trans))
+        n = shape[0]
+
+        # The real part of the inverse transform of a real spectrum is the inverse transform of its hermitian part:
+        # (f(k) + f(-k))/2, only the non redundant half of this is drawn and passed to irfft2
+        u = np.linspace(0, qny, n)
+        u_neg = u[-np.arange(n) % n]
+        n_half = n // 2 + 1
+        varience = (_prob_freq_variance(u, u[:n_half], self.qr, self.qs, self.h, extent[0]) +
+                    _prob_freq_variance(u_neg, u_neg[:n_half], self.qr, self.qs, self.h, extent[0])) / 4
+        # the first and nyquist columns are their own conjugate pairs, irfft2 averages these pairs
+        varience[:, 0] *= 2
+        if not n % 2:
+            varience[:, -1] *= 2
+
+        fou_trans = np.random.normal(size=varience.shape) * np.sqrt(varience)
+        return sfft.irfft2(fou_trans, s=(n, n), workers=-1)
 
     def __repr__(self):
         string = self._repr_helper()
@@ -322,16 +365,12 @@ class HurstFractalSurface(Surface):
         qr = self._roll_off_frequency
 
         lx, ly = [n_pts * grid_spacing for n_pts in [m, n]]
-        # make the wave vectors
-        qx = np.array([2 * np.pi / m * k for k in range(m)])
-        qx = np.unwrap((np.fft.fftshift(qx)) - 2 * np.pi) / grid_spacing
-
-        qy = np.array([2 * np.pi / n * k for k in range(n)])
-        qy = np.unwrap((np.fft.fftshift(qy)) - 2 * np.pi) / grid_spacing
+        # make the wave vectors, centred on zero so that they are exactly symmetric
+        qx = 2 * np.pi / m * (np.arange(m) - m // 2) / grid_spacing
+        qy = 2 * np.pi / n * (np.arange(n) - n // 2) / grid_spacing
 
-        # find absolute frequencies
-        qx_mesh, qy_mesh = np.meshgrid(qx, qy)
-        rho = (qy_mesh ** 2 + qx_mesh ** 2) ** 0.5
+        # find absolute frequencies, broadcasting the 1D wave vectors avoids making two full meshes
+        rho = np.sqrt(qy[:, np.newaxis] ** 2 + qx[np.newaxis, :] ** 2)
 
         # make the PSD matrix
         psd = rho ** (-2 * (hurst_exponent + 1))
@@ -339,27 +378,24 @@ class HurstFractalSurface(Surface):
         psd[n // 2, m // 2] = 0.0
 
         # Scale surface to sigma (apply rms)
-        rms_f2d = np.sqrt(sum(psd.flatten()) * (2 * np.pi) ** 2 / lx / ly)
+        rms_f2d = np.sqrt(np.sum(psd) * (2 * np.pi) ** 2 / lx / ly)
         alpha = sigma / rms_f2d
         psd *= alpha ** 2
         self.psd = np.fft.ifftshift(psd)
 
         # converting the PSD to the fft
         magnitudes = np.sqrt(psd / (grid_spacing ** 2 / (n * m * (2 * np.pi) ** 2)))
-        magnitudes = _conj_sym(magnitudes)
+        # the psd is already symmetric, only the self conjugate terms need to be removed
+        magnitudes[[0, 0, n // 2, n // 2], [0, m // 2, 0, m // 2]] = 0.0
         phases = -np.pi + (2 * np.pi) * np.random.rand(n, m)
         phases = _conj_sym(phases, neg=True)
 
-        u, v = _pol2cart(magnitudes, phases)
-        fou_trans = np.empty(u.shape, dtype=complex)
-        fou_trans.real = u
-        fou_trans.imag = v
+        fou_trans = magnitudes * np.exp(1j * phases)
 
         fou_trans = np.fft.ifftshift(fou_trans)
 
-        profile = np.fft.ifft2(fou_trans)
-
-        profile = profile.real
+        # the spectrum is conjugate symmetric so the surface is real, only the non negative x frequencies are needed
+        profile = sfft.irfft2(fou_trans[:, :m // 2 + 1], s=(n, m), workers=-1)
 
         if return_new:
             out = Surface(profile=profile, grid_spacing=grid_spacing)
@@ -397,6 +433,10 @@ def check_coords_are_simple(x_mesh, y_mesh):
     -------
     grid_spacing, extent, shape
     """
+    if x_mesh.shape[1] > 1 and np.all(x_mesh[0, :] == x_mesh[0, 0]):
+        # surface.get_points_from_extent gives meshes with x varying along the first axis
+        x_mesh, y_mesh = y_mesh, x_mesh
+
     x_mesh_check, y_mesh_check = np.meshgrid(x_mesh[0, :], x_mesh[0, :])
 
     difference = np.diff(x_mesh[0, :])
@@ -406,16 +446,28 @@ def check_coords_are_simple(x_mesh, y_mesh):
     if not x_mesh[0, 0] == 0:
         raise ValueError('x and y points must start at 0')
 
-    if not x_mesh_check == x_mesh and y_mesh_check == y_mesh:
+    if not (np.allclose(x_mesh_check, x_mesh) and np.allclose(y_mesh_check, y_mesh)):
         raise ValueError("For discretising a Probabilistic frequency surface the x and y coordinates should form"
                          " an evenly spaced grid aligned with the axes")
 
     extent = (x_mesh[0, -1], x_mesh[0, -1])
     grid_spacing = difference[0]
-    shape = [ex / grid_spacing + 1 for ex in extent]
+    shape = [int(round(ex / grid_spacing)) + 1 for ex in extent]
     return grid_spacing, extent, shape
 
 
+def _prob_freq_variance(u: np.ndarray, v: np.ndarray, qr: float, qs: float, h: float, length: float):
+    """ variance of the fourier components of a probabilistic frequency surface with frequencies u[i] + v[j]
+    """
+    q_min = 2 * np.pi / length
+    freq = np.add.outer(u, v)
+    varience = np.zeros(freq.shape)
+    varience[(q_min <= freq) & (freq < qr)] = 1.0
+    high = (qr < freq) & (freq <= qs)
+    varience[high] = (freq[high] / qr) ** (-2 * (1 + h))
+    return varience
+
+
 def _conj_sym(matrix: np.ndarray, in_place=True, neg=False):
     """ apply conjugate symmetry to a matrix
     """
@@ -439,9 +491,3 @@ def _conj_sym(matrix: np.ndarray, in_place=True, neg=False):
     matrix[n // 2 + 1:, m // 2] = mult * np.flip(matrix[1:n // 2, m // 2])
 
     return matrix
-
-
-def _pol2cart(rho, phi):
-    x = rho * np.cos(phi)
-    y = rho * np.sin(phi)
-    return x, y
@@ -0,0 +1,76 @@
+"""
+Tests for the FFT based surface classes
+"""
+import numpy as np
+import numpy.testing as npt
+
+import slippy.surface as surface
+
+
+def test_disc_freq_height():
+    frequencies = [1, 2.5, 4]
+    amplitudes = [1, 0.5, 0.2]
+    phases = [0, 1, 2]
+    my_surface = surface.DiscFreqSurface(frequencies, amplitudes, phases, shift=(0, 0))
+    x_mesh, y_mesh = np.meshgrid(np.linspace(0, 1, 17), np.linspace(0, 1, 9))
+    expected = np.zeros_like(x_mesh)
+    for f, a, p in zip(frequencies, amplitudes, phases):
+        expected += np.real(a * np.exp(1j * p) * np.exp(-1j * f * x_mesh * 2 * np.pi))
+    npt.assert_allclose(my_surface.height(x_mesh, y_mesh), expected, atol=1e-12)
+    # single points should also work
+    npt.assert_allclose(my_surface.height(x_mesh[3, 5], y_mesh[3, 5]), expected[3, 5], atol=1e-12)
+    # cached basis should be reused for the same points and reset if the frequencies change
+    npt.assert_allclose(my_surface.height(x_mesh, y_mesh), expected, atol=1e-12)
+    # meshes with x varying along the first axis, or not on a grid at all
+    npt.assert_allclose(my_surface.height(x_mesh.T, y_mesh.T), expected.T, atol=1e-12)
+    scattered_x = x_mesh + y_mesh ** 2
+    scattered_expected = np.zeros_like(x_mesh)
+    for f, a, p in zip(frequencies, amplitudes, phases):
+        scattered_expected += np.real(a * np.exp(1j * p) * np.exp(-1j * f * scattered_x * 2 * np.pi))
+    npt.assert_allclose(my_surface.height(scattered_x, y_mesh), scattered_expected, atol=1e-12)
+    # only the basis for a single line of the regular grid is kept
+    my_surface.height(x_mesh, y_mesh)
+    assert my_surface._basis_cache[1].shape == (len(frequencies), 1, x_mesh.shape[1])
+    my_surface.height(scattered_x, y_mesh)
+    assert my_surface._basis_cache[1].shape == (len(frequencies), 1, x_mesh.shape[1])
+    my_surface.frequencies = [2 * f for f in frequencies]
+    expected = np.zeros_like(x_mesh)
+    for f, a, p in zip(frequencies, amplitudes, phases):
+        expected += np.real(a * np.exp(1j * p) * np.exp(-1j * 2 * f * x_mesh * 2 * np.pi))
+    npt.assert_allclose(my_surface.height(x_mesh, y_mesh), expected, atol=1e-12)
+
+
+def test_hurst_fractal_rms():
+    np.random.seed(0)
+    my_surface = surface.HurstFractalSurface(1.5, 0.2, 10, shape=(128, 128), grid_spacing=0.01)
+    my_surface.discretise()
+    npt.assert_allclose(np.std(my_surface.profile), 1.5, rtol=1e-3)
+    npt.assert_allclose(np.mean(my_surface.profile), 0, atol=1e-10)
+
+
+def test_prob_freq_discretise():
+    np.random.seed(0)
+    for n in (32, 33):
+        my_surface = surface.ProbFreqSurface(h=0.8, qr=2, qs=60, shape=(n, n), grid_spacing=0.1)
+        my_surface.discretise()
+        assert my_surface.profile.shape == (n, n)
+        assert np.all(np.isfinite(my_surface.profile))
+        assert np.std(my_surface.profile) > 0
+
+
+def test_disc_freq_equality():
+    x_mesh, y_mesh = np.meshgrid(np.arange(4.0), np.arange(4.0))
+    surf_1 = surface.DiscFreqSurface([1, 2], [1, 0.5], [0, 1])
+    surf_2 = surface.DiscFreqSurface([1, 2], [1, 0.5], [0, 1])
+    surf_1.height(x_mesh, y_mesh)
+    assert surf_1 == surf_2
+    assert surf_1 != surface.DiscFreqSurface([1, 3], [1, 0.5], [0, 1])
+
+
+def test_disc_freq_arrays():
+    surf_1 = surface.DiscFreqSurface([1, 2], [1, 0.5], [0, 1])
+    assert surf_1.frequencies.dtype == np.float64 and surf_1.frequencies.flags.c_contiguous
+    assert surf_1.amplitudes.dtype == np.complex128 and surf_1.amplitudes.flags.c_contiguous
+    # complex amplitudes can be given directly, so the repr can be used to recreate the surface
+    surf_2 = eval('surface.' + repr(surf_1))
+    assert surf_1 == surf_2